@@ -2,7 +2,7 @@
 """
 Calendar Grid Shifter
 Extracts cells from a calendar grid image, shifts them by a specified amount,
-and creates a layered PDF with each cell on a separate layer.
+and creates a PDF with each cell drawn as a separate image.
 """
 
 import argparse
@@ -23,9 +23,6 @@ def detect_grid_cells(image, rows=5, cols=7):
     """
     width, height = image.size
     
-    # Convert to numpy array for analysis
-    img_array = np.array(image.convert('L'))
-    
     # Calculate approximate cell dimensions
     cell_width = width // cols
     cell_height = height // rows
@@ -40,10 +37,12 @@ def detect_grid_cells(image, rows=5, cols=7):
     return cells
 
 
-def extract_cells(image, rows=5, cols=7, margin_bottom=0, margin_sides=0):
+def extract_cells(image, rows=5, cols=7, margin_bottom=0, margin_sides=0,
+                  order=None):
     """
     Extract individual cells from the grid image.
-    Returns list of PIL Images, one per cell.
+    Returns a one-shot iterator of cells in `order` (default: grid order);
+    list() it for multiple passes.
     Uses precise positioning to avoid gaps and misalignment.
     """
     width, height = image.size
@@ -52,20 +51,21 @@ def extract_cells(image, rows=5, cols=7, margin_bottom=0, margin_sides=0):
     usable_width = width - (2 * margin_sides)
     usable_height = height - margin_bottom
     
-    cells = []
-    for row in range(rows):
-        for col in range(cols):
-            # Calculate precise boundaries for this cell
-            # Use fractional positioning then round to pixels
-            x1 = margin_sides + int((col * usable_width) / cols)
-            x2 = margin_sides + int(((col + 1) * usable_width) / cols)
-            y1 = int((row * usable_height) / rows)
-            y2 = int(((row + 1) * usable_height) / rows)
-            
-            # Extract cell
-            cell_box = (x1, y1, x2, y2)
-            cell = image.crop(cell_box)
-            cells.append(cell)
+    # Decode once so the crops below don't each go through the lazy loader
+    image.load()
+    
+    # Precompute cell edges once; adjacent cells share an edge so there
+    # are no gaps between them. Integer floor division keeps edges exact.
+    xs = (margin_sides + np.arange(cols + 1) * usable_width // cols).tolist()
+    ys = (np.arange(rows + 1) * usable_height // rows).tolist()
+    
+    def crop(idx):
+        row, col = divmod(int(idx), cols)
+        return image.crop((xs[col], ys[row], xs[col + 1], ys[row + 1]))
+    
+    if order is None:
+        order = range(rows * cols)
+    cells = (crop(idx) for idx in order)
     
     # Return average cell dimensions for reporting
     avg_width = usable_width / cols
@@ -74,29 +74,48 @@ def extract_cells(image, rows=5, cols=7, margin_bottom=0, margin_sides=0):
     return cells, avg_width, avg_height
 
 
-def shift_cells(cells, shift, cols=7):
+def shift_cells(total_cells, shift):
     """
-    Shift cells by the specified amount, wrapping around.
+    Compute the cell order for shifting by the specified amount, wrapping around.
+    Returns an int array whose entry j is the source cell index placed at j.
     Positive shift moves cells to the right/down.
     Negative shift moves cells to the left/up.
     """
-    total_cells = len(cells)
-    shifted = [None] * total_cells
-    
-    for i, cell in enumerate(cells):
-        new_index = (i + shift) % total_cells
-        shifted[new_index] = cell
-    
-    return shifted
+    # Cell i lands at (i + shift) % N, so position j takes (j - shift) % N
+    return (np.arange(total_cells) - shift) % total_cells
+
+
+def reader_image(cell):
+    """
+    Return the cell in a form ImageReader keeps transparency for.
+    ReportLab only splits palette alpha out of PNG-format images, which a
+    crop is not, so transparent palette cells are flattened to RGBA.
+    """
+    if cell.mode == 'PA' or (cell.mode == 'P' and 'transparency' in cell.info):
+        return cell.convert('RGBA')
+    return cell
+
+
+def cell_mask(cell):
+    """
+    Return the drawImage mask for a cell.
+    Only cells with alpha or a transparency key need ReportLab's transparency scan.
+    """
+    if cell.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La') or 'transparency' in cell.info:
+        return 'auto'
+    return None
 
 
 def create_layered_pdf(cells, output_path, rows=5, cols=7, 
                       margin_bottom=50, margin_sides=20, page_size='letter',
                       original_width=None, original_height=None):
     """
-    Create a PDF with each cell on a separate layer.
+    Create a PDF with each cell drawn as a separate image.
     """
     # Use original image dimensions if provided, otherwise use standard page size
+    # On a page matching the source image the cells already have the target
+    # aspect ratio, so ReportLab doesn't need to fit them
+    preserve_aspect = not (original_width and original_height)
     if original_width and original_height:
         page_width = original_width
         page_height = original_height
@@ -120,7 +139,7 @@ def create_layered_pdf(cells, output_path, rows=5, cols=7,
     # Create PDF
     c = canvas.Canvas(str(output_path), pagesize=pagesize)
     
-    # Add each cell as a separate layer
+    # Add each cell as a separate image
     for idx, cell in enumerate(cells):
         if cell is None:
             continue
@@ -131,25 +150,13 @@ def create_layered_pdf(cells, output_path, rows=5, cols=7,
         x = margin_sides + (col * cell_width)
         y = page_height - margin_bottom - ((row + 1) * cell_height)
         
-        # Create layer name
-        layer_name = f"Cell_{row + 1}_{col + 1}"
-        
-        # Save cell to temporary buffer
-        from io import BytesIO
-        buffer = BytesIO()
-        cell.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        # Begin new layer
-        c.saveState()
-        c.setFont("Helvetica", 6)
-        
-        # Draw the cell image
-        img_reader = ImageReader(buffer)
+        # Draw the cell image straight from PIL (no intermediate PNG encode).
+        # drawImage leaves the graphics state unchanged, so no save/restore
+        # is needed around it.
+        cell = reader_image(cell)
+        img_reader = ImageReader(cell)
         c.drawImage(img_reader, x, y, width=cell_width, height=cell_height, 
-                   mask='auto', preserveAspectRatio=True)
-        
-        c.restoreState()
+                   mask=cell_mask(cell), preserveAspectRatio=preserve_aspect)
     
     c.save()
     print(f"PDF created: {output_path}")
@@ -186,14 +193,10 @@ def create_simple_pdf(cells, output_path, rows=5, cols=7,
         x = margin_sides + (col * cell_width)
         y = page_height - margin_bottom - ((row + 1) * cell_height)
         
-        from io import BytesIO
-        buffer = BytesIO()
-        cell.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        img_reader = ImageReader(buffer)
+        cell = reader_image(cell)
+        img_reader = ImageReader(cell)
         c.drawImage(img_reader, x, y, width=cell_width, height=cell_height,
-                   mask='auto', preserveAspectRatio=True)
+                   mask=cell_mask(cell), preserveAspectRatio=True)
     
     c.save()
     print(f"PDF created: {output_path}")
@@ -201,7 +204,7 @@ def create_simple_pdf(cells, output_path, rows=5, cols=7,
 
 def main():
     parser = argparse.ArgumentParser(
-        description='Extract and shift calendar grid cells, output to layered PDF',
+        description='Extract and shift calendar grid cells, output to PDF',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
@@ -251,20 +254,21 @@ Examples:
     original_width, original_height = image.size
     print(f"Original dimensions: {original_width}x{original_height}px")
     
-    # Extract cells
+    # Shift cells
+    print(f"Shifting cells by {args.shift} positions...")
+    order = shift_cells(args.rows * args.cols, args.shift)
+    
+    # Extract cells (lazily, in shifted order, as the output is written)
     print(f"Extracting {args.rows}x{args.cols} grid...")
-    cells, cell_w, cell_h = extract_cells(
+    shifted_cells, cell_w, cell_h = extract_cells(
         image, 
         rows=args.rows, 
         cols=args.cols,
         margin_bottom=args.margin_bottom,
-        margin_sides=args.margin_sides
+        margin_sides=args.margin_sides,
+        order=order
     )
-    print(f"Extracted {len(cells)} cells (each {cell_w}x{cell_h}px)")
-    
-    # Shift cells
-    print(f"Shifting cells by {args.shift} positions...")
-    shifted_cells = shift_cells(cells, args.shift, cols=args.cols)
+    print(f"Cell size: {cell_w}x{cell_h}px")
     
     # Create output
     output_path = Path(args.output)
@@ -272,7 +276,7 @@ Examples:
     if args.preview:
         # Create preview image
         preview_path = output_path.with_suffix('.png')
-        create_preview_image(shifted_cells, preview_path, args.rows, args.cols,
+        create_preview_image(list(shifted_cells), preview_path, args.rows, args.cols,
                            args.margin_bottom, args.margin_sides)
     else:
         # Create PDF
@@ -5,6 +5,11 @@ import sys
 import os
 import argparse
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left, bisect_right
+
+# Calendar scans can legitimately exceed Pillow's decompression bomb limit
+Image.MAX_IMAGE_PIXELS = None
 
 class DraggableLine:
     def __init__(self, canvas, orientation, pos, length, tag):
@@ -28,6 +33,54 @@ class DraggableLine:
         else:
             self.canvas.coords(self.id, 0, self.pos, self.canvas.winfo_width(), self.pos)
 
+def nearest_line(lines, positions, p):
+    """
+    Find the line closest to p using bisect.
+    lines and positions must be sorted by position. Returns (line, distance),
+    or (None, inf) if there are no lines.
+    """
+    i = bisect_left(positions, p)
+    best, best_dist = None, float('inf')
+    for j in (i - 1, i):
+        if 0 <= j < len(positions):
+            dist = abs(p - positions[j])
+            if dist < best_dist:
+                best, best_dist = lines[j], dist
+    return best, best_dist
+
+def compute_overlay(rows, cols, start, v_pos, h_pos):
+    """
+    Compute the overlay cells for the current grid.
+    v_pos and h_pos are the sorted line positions. Returns a list of
+    (num, x1, y1, x2, y2) for every cell large enough to label.
+    """
+    total_cells = rows * cols
+    # Ensure indices exist (in case user reduced rows but logic still iterating)
+    n_rows = min(rows, len(h_pos) - 1)
+    n_cols = min(cols, len(v_pos) - 1)
+    
+    cells = []
+    for r in range(n_rows):
+        y1 = h_pos[r]
+        y2 = h_pos[r+1]
+        # Only draw if adequate size
+        if (y2-y1) <= 20:
+            continue
+        for c in range(n_cols):
+            x1 = v_pos[c]
+            x2 = v_pos[c+1]
+            if (x2-x1) <= 20:
+                continue
+            
+            # Wrap-around numbering:
+            # 1. Shift index so start_cell is 0
+            # 2. Modulo total cells
+            # 3. Add 1 to make it 1-based
+            num = (r * cols + c - start) % total_cells + 1
+            cells.append((num, x1, y1, x2, y2))
+    
+    return cells
+
 class CalendarExtractor:
     def __init__(self, root, image_path, output_dir=None):
         self.root = root
@@ -53,6 +106,8 @@ class CalendarExtractor:
         self.h_lines = []
         self.selected_line = None
         self.start_cell_index = 0 # 0-based index of the '1st' of the month
+        self._redraw_pending = False
+        self._overlay_ids = {} # num -> (text_id, rect_id or None)
         
         # Resizing image for display if too large
         screen_width = root.winfo_screenwidth()
@@ -72,7 +127,21 @@ class CalendarExtractor:
             display_w = int(display_w * self.display_scale)
             display_h = int(display_h * self.display_scale)
         
-        self.display_image = self.original_image.resize((display_w, display_h), Image.Resampling.LANCZOS)
+        if self.original_image.format == 'JPEG':
+            # Build the preview from a separate handle so the JPEG decoder can
+            # downscale while decoding; self.original_image stays full
+            # resolution for extraction
+            try:
+                with Image.open(self.image_path) as preview:
+                    preview.draft('RGB', (display_w, display_h))
+                    self.display_image = preview.resize((display_w, display_h), Image.Resampling.BILINEAR)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to open image: {e}")
+                sys.exit(1)
+        else:
+            # draft() does nothing for other formats, so share the one decode
+            # with extraction
+            self.display_image = self.original_image.resize((display_w, display_h), Image.Resampling.BILINEAR)
         self.photo = ImageTk.PhotoImage(self.display_image)
         
         # Control Frame (Top)
@@ -131,6 +200,8 @@ class CalendarExtractor:
             pos = int(i * step_y)
             line = DraggableLine(self.canvas, 'h', pos, w, f"h_{i}")
             self.h_lines.append(line)
+        
+        self.update_sorted_lines()
 
     def reset_grid(self):
         try:
@@ -138,9 +209,13 @@ class CalendarExtractor:
         except ValueError:
             return
         
+        # Only the grid lines and overlays are rebuilt; the image item and
+        # its PhotoImage are kept as-is
         w = self.canvas.winfo_width()
         h = self.canvas.winfo_height()
         self.init_grid_lines(w, h)
+        self.canvas.delete("overlay")
+        self._overlay_ids = {}
         self.start_cell_index = 0
         self.redraw_overlays()
 
@@ -149,25 +224,28 @@ class CalendarExtractor:
         h_sorted = sorted(self.h_lines, key=lambda l: l.pos)
         return v_sorted, h_sorted
 
+    def update_sorted_lines(self):
+        # Cached sorted positions for bisect lookups; refreshed whenever a
+        # line has been moved
+        self._v_sorted, self._h_sorted = self.get_sorted_lines()
+        self._v_pos_sorted = [l.pos for l in self._v_sorted]
+        self._h_pos_sorted = [l.pos for l in self._h_sorted]
+
     def on_click(self, event):
         # Check for line selection with threshold
         threshold = 10
-        closest_dist = threshold
         self.selected_line = None
         
         # Check vertical lines
-        for line in self.v_lines:
-            dist = abs(event.x - line.pos)
-            if dist < closest_dist:
-                closest_dist = dist
-                self.selected_line = line
+        line, dist = nearest_line(self._v_sorted, self._v_pos_sorted, event.x)
+        if dist < threshold:
+            self.selected_line = line
+            threshold = dist
         
         # Check horizontal lines (prioritize if closer)
-        for line in self.h_lines:
-            dist = abs(event.y - line.pos)
-            if dist < closest_dist:
-                closest_dist = dist
-                self.selected_line = line
+        line, dist = nearest_line(self._h_sorted, self._h_pos_sorted, event.y)
+        if dist < threshold:
+            self.selected_line = line
                 
     def on_drag(self, event):
         if self.selected_line:
@@ -182,84 +260,93 @@ class CalendarExtractor:
                 new_y = max(0, min(event.y, h))
                 self.selected_line.move_to(new_y)
             
-            self.redraw_overlays()
+            self._schedule_redraw()
+
+    def _schedule_redraw(self):
+        # Coalesce bursts of motion events into a single redraw once Tk is idle
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.canvas.after_idle(self._do_redraw)
+
+    def _do_redraw(self):
+        self._redraw_pending = False
+        self.redraw_overlays()
 
     def on_release(self, event):
+        if self.selected_line:
+            self.update_sorted_lines()
         self.selected_line = None
 
     def on_right_click(self, event):
-        v_sorted, h_sorted = self.get_sorted_lines()
-        
-        col = -1
-        row = -1
-        
-        # Find col
-        for i in range(len(v_sorted) - 1):
-            if v_sorted[i].pos <= event.x < v_sorted[i+1].pos:
-                col = i
-                break
-        
-        # Find row
-        for i in range(len(h_sorted) - 1):
-            if h_sorted[i].pos <= event.y < h_sorted[i+1].pos:
-                row = i
-                break
+        # Find the cell containing the click
+        col = bisect_right(self._v_pos_sorted, event.x) - 1
+        row = bisect_right(self._h_pos_sorted, event.y) - 1
                 
-        if col != -1 and row != -1:
+        if 0 <= col < len(self._v_pos_sorted) - 1 and 0 <= row < len(self._h_pos_sorted) - 1:
             self.start_cell_index = row * self.cols + col
             self.redraw_overlays()
             
     def redraw_overlays(self):
-        self.canvas.delete("overlay")
         v_sorted, h_sorted = self.get_sorted_lines()
+        v_pos = [l.pos for l in v_sorted]
+        h_pos = [l.pos for l in h_sorted]
         
-        total_cells = self.rows * self.cols
+        # Reuse existing canvas items where possible; only move them
+        stale = dict(self._overlay_ids)
+        for num, x1, y1, x2, y2 in compute_overlay(self.rows, self.cols, self.start_cell_index, v_pos, h_pos):
+            center_x = (x1+x2)/2
+            center_y = (y1+y2)/2
+            
+            if num in stale:
+                text_id, rect_id = stale.pop(num)
+                self.canvas.coords(text_id, center_x, center_y)
+                if rect_id is not None:
+                    self.canvas.coords(rect_id, x1+2, y1+2, x2-2, y2-2)
+            elif num == 1:
+                # Highlight Start Cell
+                rect_id = self.canvas.create_rectangle(x1+2, y1+2, x2-2, y2-2, outline="blue", width=3, tags="overlay")
+                text_id = self.canvas.create_text(center_x, center_y, text="1", font=("Arial", 16, "bold"), fill="blue", tags="overlay")
+                self._overlay_ids[num] = (text_id, rect_id)
+            else:
+                # Normal numbering
+                text_id = self.canvas.create_text(center_x, center_y, text=str(num), font=("Arial", 10), fill="gray", tags="overlay")
+                self._overlay_ids[num] = (text_id, None)
         
-        for r in range(self.rows):
-            for c in range(self.cols):
-                idx = r * self.cols + c
-                
-                # Wrap-around numbering:
-                # 1. Shift index so start_cell is 0
-                # 2. Modulo total cells
-                # 3. Add 1 to make it 1-based
-                num = (idx - self.start_cell_index) % total_cells + 1
-                
-                # Ensure indices exist (in case user reduced rows but logic still iterating)
-                if r+1 < len(h_sorted) and c+1 < len(v_sorted):
-                    x1 = v_sorted[c].pos
-                    x2 = v_sorted[c+1].pos
-                    y1 = h_sorted[r].pos
-                    y2 = h_sorted[r+1].pos
-                    
-                    # Only draw if adequate size
-                    if (x2-x1) > 20 and (y2-y1) > 20:
-                        center_x = (x1+x2)/2
-                        center_y = (y1+y2)/2
-                        
-                        if num == 1:
-                            # Highlight Start Cell
-                            self.canvas.create_rectangle(x1+2, y1+2, x2-2, y2-2, outline="blue", width=3, tags="overlay")
-                            self.canvas.create_text(center_x, center_y, text="1", font=("Arial", 16, "bold"), fill="blue", tags="overlay")
-                        else:
-                            # Normal numbering
-                            self.canvas.create_text(center_x, center_y, text=str(num), font=("Arial", 10), fill="gray", tags="overlay")
+        # Drop items for cells that are no longer drawn
+        for num, ids in stale.items():
+            for item_id in ids:
+                if item_id is not None:
+                    self.canvas.delete(item_id)
+            del self._overlay_ids[num]
+
+    def _save_cell(self, task):
+        x1, y1, x2, y2, num = task
+        try:
+            cell_img = self.original_image.crop((x1, y1, x2, y2))
+            filename = f"{num}.png"
+            save_path = self.output_dir / filename
+            # Fast deflate: cell dumps are intermediate files, size matters less
+            cell_img.save(save_path, format='PNG', compress_level=1, optimize=False)
+            return True
+        except Exception as e:
+            print(f"Error saving cell {num}: {e}")
+            return False
 
     def save(self):
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-        else:
-            # Check if directory is empty, warn if not?
-            # For now, just overwrite
-            pass
+        # Existing files are overwritten
+        self.output_dir.mkdir(parents=True, exist_ok=True)
             
         padding = self.padding_var.get()
         scale = 1.0 / self.display_scale
         
         v_sorted, h_sorted = self.get_sorted_lines()
         
+        # Transform line positions to original image space once
+        vx = [int(l.pos * scale) for l in v_sorted]
+        hy = [int(l.pos * scale) for l in h_sorted]
+        
         total_cells = self.rows * self.cols
-        saved_count = 0
+        tasks = []
         
         print(f"Extracting cells to {self.output_dir}...")
         
@@ -273,30 +360,24 @@ class CalendarExtractor:
                 # Calculate Number
                 num = (idx - self.start_cell_index) % total_cells + 1
 
-                # Get coordinates in display space
-                x1_d = v_sorted[c].pos
-                x2_d = v_sorted[c+1].pos
-                y1_d = h_sorted[r].pos
-                y2_d = h_sorted[r+1].pos
-                
-                # Transform to original image space
-                x1 = int(x1_d * scale) + padding
-                x2 = int(x2_d * scale) - padding
-                y1 = int(y1_d * scale) + padding
-                y2 = int(y2_d * scale) - padding
+                x1 = vx[c] + padding
+                x2 = vx[c+1] - padding
+                y1 = hy[r] + padding
+                y2 = hy[r+1] - padding
                 
                 if x2 <= x1 or y2 <= y1:
                     print(f"Skipping cell {num} (dimensions too small after padding)")
                     continue
                 
-                try:
-                    cell_img = self.original_image.crop((x1, y1, x2, y2))
-                    filename = f"{num}.png"
-                    save_path = self.output_dir / filename
-                    cell_img.save(save_path)
-                    saved_count += 1
-                except Exception as e:
-                    print(f"Error saving cell {num}: {e}")
+                tasks.append((x1, y1, x2, y2, num))
+        
+        # Coordinates are gathered from Tk above; the crops and PNG encodes
+        # don't touch Tk, so they can run on worker threads (Pillow releases
+        # the GIL while encoding). Decode the source up front so the worker
+        # threads don't race on Image.open's lazy load.
+        self.original_image.load()
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            saved_count = sum(executor.map(self._save_cell, tasks))
                 
         messagebox.showinfo("Success", f"Extracted {saved_count} cells to\n{self.output_dir}")
         self.root.destroy()